@@ -0,0 +1,196 @@
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Any, Optional
+
+# 内存缓存清理过期条目的最小间隔（秒）
+SWEEP_INTERVAL = 60
+
+
+class SharedCache(ABC):
+    """
+    共享缓存接口，用于在多个机器人实例之间复用搜索结果、分享链接和转存状态
+
+    所有值都需要能被 JSON 序列化，ttl 单位为秒
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回 None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        """写入缓存"""
+
+    @abstractmethod
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        原子地认领一个键，用于保证同一个转存任务只由一个进程执行
+
+        Args:
+            key: 要认领的键
+            owner: 认领者标识
+            ttl: 认领有效期，过期后其他进程可以重新认领
+
+        Returns:
+            认领成功返回 True，已被其他认领者持有返回 False
+        """
+
+    @abstractmethod
+    async def release(self, key: str, owner: str):
+        """释放由 owner 持有的认领"""
+
+    async def close(self):
+        """关闭缓存"""
+        pass
+
+
+class MemoryCache(SharedCache):
+    """
+    进程内缓存实现，仅在单个进程内共享
+
+    读写时都会复制值，与 SQLite 实现一样每个调用方拿到的都是独立的副本
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._claims = {}
+        self._last_sweep = time.time()
+
+    def _sweep(self, now: float):
+        """定期清理过期的缓存和认领"""
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        self._data = {k: v for k, v in self._data.items() if v[1] >= now}
+        self._claims = {k: v for k, v in self._claims.items() if v[1] >= now}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            self._data.pop(key, None)
+            return None
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        self._sweep(now)
+        self._data[key] = (copy.deepcopy(value), now + ttl)
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        self._sweep(now)
+        holder = self._claims.get(key)
+        if holder is not None and holder[0] != owner and holder[1] >= now:
+            return False
+        self._claims[key] = (owner, now + ttl)
+        return True
+
+    async def release(self, key: str, owner: str):
+        holder = self._claims.get(key)
+        if holder is not None and holder[0] == owner:
+            self._claims.pop(key, None)
+
+
+class SQLiteCache(SharedCache):
+    """
+    基于 SQLite 文件的缓存实现，同一台机器上的多个进程可以同时使用
+
+    数据库操作在线程池中执行，不会阻塞事件循环
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS claims_expires_at ON claims (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires_at < ?", (key, time.time()))
+                return None
+            return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl)
+            )
+
+    def _claim(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM claims WHERE expires_at < ?", (now,))
+            # 仅当键未被认领、认领已过期或本来就由 owner 持有时才会更新
+            cursor = conn.execute(
+                "INSERT INTO claims (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE claims.expires_at < ? OR claims.owner = excluded.owner",
+                (key, owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def _release(self, key: str, owner: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, owner))
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def claim(self, key: str, owner: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._claim, key, owner, ttl)
+
+    async def release(self, key: str, owner: str):
+        await asyncio.to_thread(self._release, key, owner)
+
+
+def create_cache(config: dict) -> SharedCache:
+    """
+    根据配置创建缓存实例
+
+    Args:
+        config: 插件配置，cache_backend 可选 memory（默认）或 sqlite，
+            sqlite 时通过 cache_path 指定数据库文件路径
+
+    Returns:
+        缓存实例
+    """
+    backend = config.get("cache_backend", "memory")
+    if backend == "sqlite":
+        return SQLiteCache(config.get("cache_path", "data/clocc_search_cache.db"))
+    return MemoryCache()
@@ -1,16 +1,43 @@
-from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
+from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult, MessageChain
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 import aiohttp
 import json
 import re
 from typing import Optional, Tuple
+from collections import deque
 import asyncio
 import requests
 import urllib.parse
 import time
 import uuid
 
+from .cache import create_cache
+from .session_store import SessionStore
+
+# 搜索结果缓存时间（秒）
+SEARCH_CACHE_TTL = 600
+# 分享链接缓存时间（秒），分享链接为永久有效
+SHARE_CACHE_TTL = 86400
+# 转存认领有效期（秒），略大于转存接口超时时间
+TRANSFER_CLAIM_TTL = 330
+# 转存状态轮询间隔（秒）
+TRANSFER_POLL_INTERVAL = 5
+# 转存完成通知的合并等待时间（秒），期间同一会话的通知合并为一条消息
+NOTIFY_BATCH_DELAY = 3
+# 每个会话最多缓存的待发送通知数量
+NOTIFY_QUEUE_SIZE = 20
+# 单次获取的最大资源数量
+MAX_BATCH_ITEMS = 10
+# 持久化会话时保留的结果字段
+SESSION_ITEM_FIELDS = ("note", "url", "password", "type", "dead")
+# 链接有效性检测结果缓存时间（秒）
+LIVENESS_CACHE_TTL = 3600
+# 百度网盘分享页面中表示链接失效的提示
+BAIDU_DEAD_MARKERS = ("你来晚了", "分享的文件已经被取消", "分享的文件已经被删除", "链接不存在", "分享已过期", "涉及侵权")
+# 夸克网盘分享接口返回中表示链接失效的提示
+QUARK_DEAD_MARKERS = ("不存在", "失效", "取消", "过期", "违规", "删除")
+
 @register("clocc_search", "YourName", "CloCC资源搜索插件", "1.0.0")
 class MyPlugin(Star):
     def __init__(self, context: Context):
@@ -22,13 +49,65 @@ class MyPlugin(Star):
         # 用于存储正在进行异步转存的任务
         self.pending_transfers = {}
         # 获取配置中的忽略关键词列表，默认忽略"小说"
-        config_ignored_keywords = context.get_config().get("ignored_keywords", [])
+        config = context.get_config()
+        config_ignored_keywords = config.get("ignored_keywords", [])
         self.ignored_keywords = config_ignored_keywords + ["小说"]
+        # 共享缓存，多个实例配置为同一个 sqlite 文件即可复用搜索结果、分享链接和转存状态
+        self.cache = create_cache(config)
+        # 批量获取时生成分享链接的最大并发数
+        self.batch_concurrency = max(1, int(config.get("batch_concurrency", 3)))
+        # 搜索后是否在后台检测原始链接是否有效，以及检测的最大并发数
+        self.check_links = config.get("check_links", True)
+        self.liveness_concurrency = max(1, int(config.get("liveness_concurrency", 5)))
+        # 每个用户正在进行的链接检测任务
+        self.liveness_tasks = {}
+        # 每个会话待发送的转存通知及对应的发送任务
+        self.notify_queues = {}
+        self.notify_tasks = {}
+        # 可选的会话持久化，重启后用户仍可继续翻页和获取
+        self.session_store = None
+        if config.get("persist_sessions", False):
+            self.session_store = SessionStore(config.get("session_path", "data/clocc_search_sessions.db"))
 
     async def initialize(self):
         """插件初始化"""
         logger.info(f"插件初始化，忽略关键词列表: {self.ignored_keywords}")
-        pass
+        if self.session_store:
+            self.session_store.start()
+    
+    async def load_session(self, user_id: str) -> bool:
+        """
+        确保用户会话已加载到内存，内存中没有时从持久化存储中读取
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            用户存在搜索结果时返回 True
+        """
+        if self.user_search_results.get(user_id):
+            return True
+        if not self.session_store:
+            return False
+        session = await self.session_store.load(user_id)
+        if not session or not session.get("results"):
+            return False
+        self.user_search_results[user_id] = session["results"]
+        self.user_pagination[user_id] = session.get("pagination", {"page": 1, "per_page": 10})
+        return True
+    
+    def save_session(self, user_id: str):
+        """将用户会话交给持久化存储异步写入"""
+        if not self.session_store:
+            return
+        results = [
+            {k: item[k] for k in SESSION_ITEM_FIELDS if k in item}
+            for item in self.user_search_results.get(user_id, [])
+        ]
+        self.session_store.save(user_id, {
+            "results": results,
+            "pagination": dict(self.user_pagination.get(user_id, {"page": 1, "per_page": 10}))
+        })
     
     def generate_share_link_by_path(self, folder_path: str) -> dict:
         """
@@ -127,6 +206,32 @@ class MyPlugin(Star):
                 "share_info": None
             }
     
+    async def get_share_link(self, pan_type: str, folder_path: str) -> dict:
+        """
+        获取文件夹的分享链接，优先从共享缓存中读取
+        
+        Args:
+            pan_type: 网盘类型，baidu 或 quark
+            folder_path: 文件夹路径
+            
+        Returns:
+            包含分享链接信息的字典
+        """
+        cache_key = f"share:{pan_type}:{folder_path}"
+        cached = await self.cache.get(cache_key)
+        if cached:
+            logger.info(f"命中分享链接缓存: {folder_path}")
+            return cached
+        
+        if pan_type == "baidu":
+            share_result = await asyncio.to_thread(self.generate_share_link_by_path, folder_path)
+        else:
+            share_result = await asyncio.to_thread(self.generate_quark_share_link_by_path, folder_path)
+        
+        if share_result["success"]:
+            await self.cache.set(cache_key, share_result, SHARE_CACHE_TTL)
+        return share_result
+    
     # 搜索功能：当消息以"搜"开头时触发
     @filter.regex(r"^搜(.+)")  
     async def search_handler(self, event: AstrMessageEvent, match):
@@ -154,8 +259,8 @@ class MyPlugin(Star):
         else:
             yield event.plain_result("搜索格式不正确，请使用：搜+关键词")
 
-    # 处理用户输入的编号（获取详细信息）
-    @filter.regex(r"^获取(\d+)$")  
+    # 处理用户输入的编号（获取详细信息），支持多个编号和范围，如：获取1,3,5、获取1-3
+    @filter.regex(r"^获取(\d+(?:\s*-\s*\d+)?(?:\s*[,，]\s*\d+(?:\s*-\s*\d+)?)*)$")  
     async def number_handler(self, event: AstrMessageEvent, match):
         """处理用户输入的编号"""
         message_str = event.get_message_str().strip()
@@ -163,104 +268,142 @@ class MyPlugin(Star):
         
         # 使用正则表达式提取编号
         if match:
+            if not await self.load_session(user_id):
+                yield event.plain_result("没有可获取的搜索结果，请先发送 '搜+关键词' 进行搜索")
+                return
             try:
-                index = int(match.group(1))
-                search_results = self.user_search_results[user_id]
-                # 获取当前页码信息
-                pagination = self.user_pagination.get(user_id, {"page": 1, "per_page": 10})
-                current_page = pagination["page"]
-                per_page = pagination["per_page"]
-                
-                # 计算实际索引（考虑分页）
-                actual_index = (current_page - 1) * per_page + index
-                
-                if 1 <= actual_index <= len(search_results):
-                    # 获取对应编号的详细信息
-                    item = search_results[actual_index - 1]
-                    title = item.get("note", "未知标题")
-                    url = item.get("url", "未知链接")
-                    password = item.get("password", "")
-                    source = "百度网盘" if item.get("type") == "baidu" else "夸克网盘"
-                    
-                    # 如果是百度网盘，使用优化后的逻辑
-                    if item.get("type") == "baidu":
-                        yield event.plain_result("🔄 正在努力加载资源，请稍后... (´∀｀)♡")
-                        
-                        # 生成唯一的任务ID
-                        task_id = str(uuid.uuid4())
-                        
-                        # 生成安全的文件夹名称
-                        safe_title = "".join(c for c in title if c.isalnum() or c in "._- " or '\u4e00' <= c <= '\u9fff')
-                        safe_title = re.sub(r'\s+', '_', safe_title.strip())
-                        if not safe_title:
-                            safe_title = "未知资源"
-                        
-                        # 创建资源文件夹路径，使用资源标题命名
-                        folder_path = f"/pansou_downloads/{safe_title}"
-                        
-                        # 生成分享链接
-                        share_result = self.generate_share_link_by_path(folder_path)
-                        if not share_result["success"]:
-                            yield event.plain_result(f"❌ 生成分享链接失败: {share_result['message']}")
-                            return
-                        
-                        share_url = share_result["share_info"]["url"]
-                        share_password = share_result["share_info"]["password"]
-                        
-                        # 立即返回分享链接给用户
-                        result = f"🔍 资源详情:\n📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {share_url}?pwd={share_password}\n💡 若链接未显示资源，先稍等几秒再重点击；超过 15 秒依旧空白，可能为链接被和谐，建议获取其他资源。"
-                        yield event.plain_result(result)
-                        
-                        # 异步执行转存任务
-                        asyncio.create_task(self.async_transfer_baidu_resource(task_id, url, folder_path))
-                    # 如果是夸克网盘，使用优化后的逻辑
-                    elif item.get("type") == "quark":
-                        yield event.plain_result("🔄 正在努力加载资源，请稍后... (´∀｀)♡")
-                        
-                        # 生成唯一的任务ID
-                        task_id = str(uuid.uuid4())
-                        
-                        # 生成安全的文件夹名称
-                        safe_title = "".join(c for c in title if c.isalnum() or c in "._- " or '\u4e00' <= c <= '\u9fff')
-                        safe_title = re.sub(r'\s+', '_', safe_title.strip())
-                        if not safe_title:
-                            safe_title = "未知资源"
-                        
-                        # 创建资源文件夹路径，使用资源标题命名
-                        folder_path = f"/pansou_downloads/{safe_title}"
-                        
-                        # 生成分享链接
-                        share_result = self.generate_quark_share_link_by_path(folder_path)
-                        if not share_result["success"]:
-                            yield event.plain_result(f"❌ 生成分享链接失败: {share_result['message']}")
-                            return
-                        
-                        share_url = share_result["share_info"]["url"]
-                        passcode = share_result["share_info"]["passcode"]
-                        
-                        # 立即返回分享链接给用户
-                        result = f"🔍 资源详情:\n📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {share_url}"
-                        if passcode:
-                            result += f"\n🔑 提取码: {passcode}"
-                        result += f"\n💡 若链接未显示资源，先稍等几秒再重点击；超过 15 秒依旧空白，可能链接被和谐，建议获取其他资源。"
-                        yield event.plain_result(result)
-                        
-                        # 异步执行转存任务
-                        asyncio.create_task(self.async_transfer_quark_resource(task_id, url, folder_path))
-                    else:
-                        # 其他类型直接显示详情
-                        result = f"🔍 资源详情:\n📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {url}"
-                        if password:
-                            result += f"\n🔑 密码: {password}"
-                        yield event.plain_result(result)
-                else:
-                    yield event.plain_result(f"请输入有效的编号 (1-{min(per_page, len(search_results) - (current_page-1) * per_page)})")
+                indexes = self.parse_indexes(match.group(1))
             except ValueError:
                 yield event.plain_result("请输入有效的数字编号")
+                return
+            
+            search_results = self.user_search_results[user_id]
+            # 获取当前页码信息
+            pagination = self.user_pagination.get(user_id, {"page": 1, "per_page": 10})
+            current_page = pagination["page"]
+            per_page = pagination["per_page"]
+            page_count = min(per_page, len(search_results) - (current_page - 1) * per_page)
+            
+            if len(indexes) > MAX_BATCH_ITEMS:
+                yield event.plain_result(f"一次最多获取 {MAX_BATCH_ITEMS} 个资源")
+                return
+            if any(not 1 <= index <= page_count for index in indexes):
+                yield event.plain_result(f"请输入有效的编号 (1-{page_count})")
+                return
+            
+            # 计算实际索引（考虑分页）
+            items = [search_results[(current_page - 1) * per_page + index - 1] for index in indexes]
+            if any(item.get("type") in ("baidu", "quark") for item in items):
+                yield event.plain_result("🔄 正在努力加载资源，请稍后... (´∀｀)♡")
+            
+            # 并发生成所有分享链接，并限制单次请求的并发数
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            prepared = await asyncio.gather(*(self.prepare_item(item, semaphore) for item in items))
+            
+            details = []
+            transfers = []
+            for index, (detail, transfer) in zip(indexes, prepared):
+                header = "🔍 资源详情:" if len(indexes) == 1 else f"🔍 资源 {index} 详情:"
+                details.append(f"{header}\n{detail}")
+                if transfer:
+                    transfers.append(transfer)
+            
+            result = "\n\n".join(details)
+            if transfers:
+                result += "\n💡 资源正在转存，完成后会在这里通知，收到通知前链接可能暂时为空。"
+            yield event.plain_result(result)
+            
+            # 批量提交转存任务
+            for pan_type, url, folder_path in transfers:
+                task_id = str(uuid.uuid4())
+                if pan_type == "baidu":
+                    asyncio.create_task(self.async_transfer_baidu_resource(task_id, url, folder_path, event.unified_msg_origin))
+                else:
+                    asyncio.create_task(self.async_transfer_quark_resource(task_id, url, folder_path, event.unified_msg_origin))
         else:
             # 如果用户没有待处理的搜索结果，则不处理数字消息
             pass
 
+    def parse_indexes(self, text: str) -> list:
+        """
+        解析编号列表，支持逗号分隔和范围写法
+        
+        Args:
+            text: 编号文本，如 "1,3,5" 或 "1-3"
+            
+        Returns:
+            去重后保持输入顺序的编号列表
+        """
+        indexes = []
+        for part in re.split(r"[,，]", text):
+            part = part.strip()
+            if "-" in part:
+                start, end = (int(n) for n in part.split("-", 1))
+                if start > end:
+                    start, end = end, start
+                # 最多展开到超出上限一个，超大范围不会占用内存，由调用方提示数量超限
+                numbers = range(start, min(end, start + MAX_BATCH_ITEMS) + 1)
+            else:
+                numbers = [int(part)]
+            for number in numbers:
+                if number not in indexes:
+                    indexes.append(number)
+            if len(indexes) > MAX_BATCH_ITEMS:
+                break
+        return indexes
+
+    async def prepare_item(self, item: dict, semaphore: asyncio.Semaphore) -> Tuple[str, Optional[Tuple[str, str, str]]]:
+        """
+        生成单个资源的详情文本
+        
+        Args:
+            item: 搜索结果条目
+            semaphore: 限制分享链接生成并发数的信号量
+            
+        Returns:
+            (详情文本, 转存任务)，转存任务为 (网盘类型, 原始链接, 目标文件夹路径)，无需转存时为 None
+        """
+        title = item.get("note", "未知标题")
+        url = item.get("url", "未知链接")
+        password = item.get("password", "")
+        pan_type = item.get("type")
+        source = "百度网盘" if pan_type == "baidu" else "夸克网盘"
+        
+        if pan_type not in ("baidu", "quark"):
+            # 其他类型直接显示详情
+            detail = f"📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {url}"
+            if password:
+                detail += f"\n🔑 密码: {password}"
+            return detail, None
+        
+        # 已知失效的链接不再转存
+        if item.get("dead") or await self.cache.get(f"liveness:{url}") is False:
+            return f"📖 标题: {title}\n❌ 原始链接已失效，无法转存，建议获取其他资源", None
+        
+        # 生成安全的文件夹名称
+        safe_title = "".join(c for c in title if c.isalnum() or c in "._- " or '\u4e00' <= c <= '\u9fff')
+        safe_title = re.sub(r'\s+', '_', safe_title.strip())
+        if not safe_title:
+            safe_title = "未知资源"
+        
+        # 创建资源文件夹路径，使用资源标题命名
+        folder_path = f"/pansou_downloads/{safe_title}"
+        
+        # 生成分享链接
+        async with semaphore:
+            share_result = await self.get_share_link(pan_type, folder_path)
+        if not share_result["success"]:
+            return f"📖 标题: {title}\n❌ 生成分享链接失败: {share_result['message']}", None
+        
+        share_info = share_result["share_info"]
+        if pan_type == "baidu":
+            detail = f"📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {share_info['url']}?pwd={share_info['password']}"
+        else:
+            detail = f"📖 标题: {title}\n🔗 来源: {source}\n🌐 链接: {share_info['url']}"
+            if share_info.get("passcode"):
+                detail += f"\n🔑 提取码: {share_info['passcode']}"
+        return detail, (pan_type, url, folder_path)
+
     # 处理下一页指令（不加斜杠）
     @filter.regex(r"^下一页$")  
     async def next_page_handler(self, event: AstrMessageEvent, match):
@@ -268,7 +411,7 @@ class MyPlugin(Star):
         user_id = event.get_sender_id()
         
         # 检查用户是否有待处理的搜索结果
-        if user_id in self.user_search_results and self.user_search_results[user_id]:
+        if await self.load_session(user_id):
             # 获取分页信息
             if user_id not in self.user_pagination:
                 self.user_pagination[user_id] = {"page": 1, "per_page": 10}
@@ -283,6 +426,7 @@ class MyPlugin(Star):
             
             if current_page < total_pages:
                 pagination["page"] = current_page + 1
+                self.save_session(user_id)
                 # 显示新页面的结果
                 result = self.format_paginated_results(user_id, search_results, pagination)
                 yield event.plain_result(result)
@@ -298,7 +442,7 @@ class MyPlugin(Star):
         user_id = event.get_sender_id()
         
         # 检查用户是否有待处理的搜索结果
-        if user_id in self.user_search_results and self.user_search_results[user_id]:
+        if await self.load_session(user_id):
             # 获取分页信息
             if user_id not in self.user_pagination:
                 self.user_pagination[user_id] = {"page": 1, "per_page": 10}
@@ -308,6 +452,7 @@ class MyPlugin(Star):
             
             if current_page > 1:
                 pagination["page"] = current_page - 1
+                self.save_session(user_id)
                 # 显示新页面的结果
                 search_results = self.user_search_results[user_id]
                 result = self.format_paginated_results(user_id, search_results, pagination)
@@ -333,6 +478,13 @@ class MyPlugin(Star):
             "User-Agent": "AstrBot-Search-Plugin/1.0"
         }
         
+        # 优先使用共享缓存中的搜索结果
+        cache_key = f"search:{keyword}"
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"命中搜索缓存: {keyword}")
+            return self.format_search_results(cached, keyword, user_id)
+        
         try:
             logger.info(f"正在调用搜索接口: {url}")
             
@@ -345,6 +497,7 @@ class MyPlugin(Star):
                     if response.status == 200:
                         data = await response.json()
                         logger.info(f"搜索接口响应数据: {data}")
+                        await self.cache.set(cache_key, data, SEARCH_CACHE_TTL)
                         return self.format_search_results(data, keyword, user_id)
                     else:
                         error_text = await response.text()
@@ -501,6 +654,10 @@ class MyPlugin(Star):
             self.user_search_results[user_id] = all_results
             # 初始化分页信息
             self.user_pagination[user_id] = {"page": 1, "per_page": 10}
+            self.save_session(user_id)
+            # 在后台检测链接有效性
+            if self.check_links:
+                self.start_link_validation(user_id)
             
             # 返回第一页的结果
             pagination = self.user_pagination[user_id]
@@ -605,6 +762,8 @@ class MyPlugin(Star):
         
         for i, item in enumerate(page_results, 1):
             title = item.get("note", "未知标题")
+            if item.get("dead"):
+                title += " ❌已失效"
             if item.get("type") == "baidu":
                 baidu_items.append(f"{i}. {title}")
             elif item.get("type") == "quark":
@@ -638,7 +797,220 @@ class MyPlugin(Star):
         
         return "\n".join(formatted_results)
 
-    async def async_transfer_baidu_resource(self, task_id: str, original_url: str, folder_path: str):
+    def start_link_validation(self, user_id: str):
+        """为用户最新的搜索结果启动后台链接检测，取消之前未完成的检测"""
+        previous = self.liveness_tasks.pop(user_id, None)
+        if previous:
+            previous.cancel()
+        task = asyncio.create_task(self.validate_search_results(user_id, self.user_search_results[user_id]))
+        self.liveness_tasks[user_id] = task
+        task.add_done_callback(lambda t: self.liveness_tasks.pop(user_id, None) if self.liveness_tasks.get(user_id) is t else None)
+    
+    async def validate_search_results(self, user_id: str, results: list):
+        """
+        检测搜索结果中原始链接的有效性，标记失效条目并将其移到后面的页
+        
+        Args:
+            user_id: 用户ID
+            results: 需要检测的搜索结果列表
+        """
+        semaphore = asyncio.Semaphore(self.liveness_concurrency)
+        urls = list(dict.fromkeys(item.get("url") for item in results if item.get("url")))
+        types = {item.get("url"): item.get("type") for item in results}
+        
+        try:
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async def check(url: str) -> Optional[bool]:
+                    async with semaphore:
+                        return await self.get_link_liveness(session, url, types.get(url))
+                verdicts = dict(zip(urls, await asyncio.gather(*(check(url) for url in urls))))
+        except Exception as e:
+            logger.error(f"链接有效性检测失败: {e}")
+            return
+        
+        dead_count = 0
+        for item in results:
+            if verdicts.get(item.get("url")) is False:
+                item["dead"] = True
+                dead_count += 1
+        
+        # 用户已经重新搜索时不再调整旧结果
+        if self.user_search_results.get(user_id) is not results or not dead_count:
+            return
+        
+        # 当前页及之前的编号保持不变，之后的结果把失效条目排到最后
+        pagination = self.user_pagination.get(user_id, {"page": 1, "per_page": 10})
+        shown = pagination["page"] * pagination["per_page"]
+        rest = results[shown:]
+        results[shown:] = [item for item in rest if not item.get("dead")] + [item for item in rest if item.get("dead")]
+        self.save_session(user_id)
+        logger.info(f"链接有效性检测完成，共 {len(urls)} 个链接，失效 {dead_count} 个")
+    
+    async def get_link_liveness(self, session: aiohttp.ClientSession, url: str, pan_type: Optional[str]) -> Optional[bool]:
+        """
+        获取链接有效性，优先从共享缓存中读取
+        
+        Args:
+            session: HTTP 会话
+            url: 原始网盘链接
+            pan_type: 网盘类型，baidu 或 quark
+            
+        Returns:
+            有效返回 True，失效返回 False，无法判断返回 None
+        """
+        cache_key = f"liveness:{url}"
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            if pan_type == "baidu":
+                alive = await self.check_baidu_link(session, url)
+            elif pan_type == "quark":
+                alive = await self.check_quark_link(session, url)
+            else:
+                alive = None
+        except Exception as e:
+            logger.warning(f"检测链接有效性异常: {url}, {e}")
+            alive = None
+        
+        # 只缓存明确的检测结果
+        if alive is not None:
+            await self.cache.set(cache_key, alive, LIVENESS_CACHE_TTL)
+        return alive
+    
+    async def check_baidu_link(self, session: aiohttp.ClientSession, url: str) -> Optional[bool]:
+        """通过分享页面内容判断百度网盘链接是否有效"""
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+        }
+        async with session.get(url, headers=headers) as response:
+            if "/share/error" in str(response.url):
+                return False
+            if response.status != 200:
+                return None
+            text = await response.text(errors="ignore")
+            return not any(marker in text for marker in BAIDU_DEAD_MARKERS)
+    
+    async def check_quark_link(self, session: aiohttp.ClientSession, url: str) -> Optional[bool]:
+        """通过夸克网盘分享接口判断链接是否有效"""
+        match = re.search(r"/s/([A-Za-z0-9]+)", url)
+        if not match:
+            return None
+        
+        token_url = "https://drive-pc.quark.cn/1/clouddrive/share/sharepage/token?pr=ucpro&fr=pc"
+        data = {
+            "pwd_id": match.group(1),
+            "passcode": ""
+        }
+        async with session.post(token_url, json=data) as response:
+            result = await response.json(content_type=None)
+        if result.get("code") == 0:
+            return True
+        message = str(result.get("message", ""))
+        if any(marker in message for marker in QUARK_DEAD_MARKERS):
+            return False
+        return None
+    
+    def transfer_key(self, original_url: str, folder_path: str) -> str:
+        """生成转存任务在共享缓存中的键"""
+        return f"{original_url}|{folder_path}"
+    
+    async def claim_transfer(self, task_id: str, original_url: str, folder_path: str) -> bool:
+        """
+        认领转存任务，保证同一资源只由一个任务转存
+        
+        Args:
+            task_id: 任务ID
+            original_url: 原始网盘链接
+            folder_path: 目标文件夹路径
+            
+        Returns:
+            认领成功返回 True，任务已完成或正由其他任务执行时返回 False
+        """
+        key = self.transfer_key(original_url, folder_path)
+        status = await self.cache.get(f"transfer_status:{key}")
+        if status and status.get("status") == "completed":
+            return False
+        if not await self.cache.claim(f"transfer:{key}", task_id, TRANSFER_CLAIM_TTL):
+            return False
+        # 覆盖之前任务留下的失败状态，避免等待者误认为本次转存已失败
+        await self.cache.set(f"transfer_status:{key}", {"status": "transferring", "task_id": task_id}, TRANSFER_CLAIM_TTL)
+        return True
+    
+    async def finish_transfer(self, task_id: str, original_url: str, folder_path: str):
+        """将转存结果写入共享缓存并释放认领"""
+        key = self.transfer_key(original_url, folder_path)
+        transfer = dict(self.pending_transfers.get(task_id, {}), task_id=task_id, finished_at=time.time())
+        # 失败状态只短暂保留，便于稍后重试
+        ttl = SHARE_CACHE_TTL if transfer.get("status") == "completed" else 60
+        await self.cache.set(f"transfer_status:{key}", transfer, ttl)
+        await self.cache.release(f"transfer:{key}", task_id)
+    
+    async def wait_shared_transfer(self, original_url: str, folder_path: str) -> dict:
+        """
+        等待由其他任务执行的转存结束
+        
+        Args:
+            original_url: 原始网盘链接
+            folder_path: 目标文件夹路径
+            
+        Returns:
+            转存状态字典
+        """
+        key = self.transfer_key(original_url, folder_path)
+        started_at = time.time()
+        deadline = started_at + TRANSFER_CLAIM_TTL
+        while time.time() < deadline:
+            status = await self.cache.get(f"transfer_status:{key}")
+            if status and status.get("status") == "completed":
+                return status
+            # 只认开始等待之后结束的失败，忽略更早任务留下的失败状态
+            if status and status.get("status") == "failed" and status.get("finished_at", 0) >= started_at:
+                return status
+            await asyncio.sleep(TRANSFER_POLL_INTERVAL)
+        return {"status": "failed", "error": "等待转存结果超时"}
+    
+    def notify_transfer_result(self, umo: Optional[str], folder_path: str, transfer: dict):
+        """
+        将转存结果加入发起会话的通知队列
+        
+        Args:
+            umo: 发起转存的会话标识，为空时不通知
+            folder_path: 目标文件夹路径
+            transfer: 转存状态字典
+        """
+        if not umo:
+            return
+        name = folder_path.rstrip("/").rsplit("/", 1)[-1]
+        if transfer.get("status") == "completed":
+            text = f"✅ 「{name}」已转存完成，现在打开链接即可查看资源"
+        else:
+            text = f"❌ 「{name}」转存失败: {transfer.get('error', '未知错误')}，可能链接已被和谐，建议获取其他资源"
+        
+        queue = self.notify_queues.setdefault(umo, deque(maxlen=NOTIFY_QUEUE_SIZE))
+        if len(queue) == queue.maxlen:
+            logger.warning(f"会话 {umo} 的通知队列已满，丢弃最早的通知")
+        queue.append(text)
+        if umo not in self.notify_tasks:
+            self.notify_tasks[umo] = asyncio.create_task(self.flush_notifications(umo))
+    
+    async def flush_notifications(self, umo: str):
+        """等待一小段时间后将会话内积累的通知合并为一条消息发送"""
+        try:
+            await asyncio.sleep(NOTIFY_BATCH_DELAY)
+        finally:
+            self.notify_tasks.pop(umo, None)
+            queue = self.notify_queues.pop(umo, None)
+        if not queue:
+            return
+        try:
+            await self.context.send_message(umo, MessageChain().message("\n".join(queue)))
+        except Exception as e:
+            logger.error(f"发送转存通知失败: {e}")
+    
+    async def async_transfer_baidu_resource(self, task_id: str, original_url: str, folder_path: str, umo: Optional[str] = None):
         """
         异步转存百度网盘资源到指定文件夹
         
@@ -646,7 +1018,15 @@ class MyPlugin(Star):
             task_id: 任务ID
             original_url: 原始百度网盘链接
             folder_path: 目标文件夹路径
+            umo: 发起转存的会话标识，转存结束后向该会话发送通知
         """
+        if not await self.claim_transfer(task_id, original_url, folder_path):
+            logger.info(f"百度网盘资源已转存或正由其他任务转存，跳过: {original_url} -> {folder_path}")
+            if umo:
+                transfer = await self.wait_shared_transfer(original_url, folder_path)
+                self.notify_transfer_result(umo, folder_path, transfer)
+            return
+        
         try:
             # 标记任务为进行中
             self.pending_transfers[task_id] = {
@@ -696,8 +1076,11 @@ class MyPlugin(Star):
             self.pending_transfers[task_id]["status"] = "failed"
             self.pending_transfers[task_id]["error"] = str(e)
             logger.error(f"百度网盘资源转存异常: {e}")
+        finally:
+            await self.finish_transfer(task_id, original_url, folder_path)
+            self.notify_transfer_result(umo, folder_path, self.pending_transfers.get(task_id, {}))
     
-    async def async_transfer_quark_resource(self, task_id: str, original_url: str, folder_path: str):
+    async def async_transfer_quark_resource(self, task_id: str, original_url: str, folder_path: str, umo: Optional[str] = None):
         """
         异步转存夸克网盘资源到指定文件夹
         
@@ -705,7 +1088,15 @@ class MyPlugin(Star):
             task_id: 任务ID
             original_url: 原始夸克网盘链接
             folder_path: 目标文件夹路径
+            umo: 发起转存的会话标识，转存结束后向该会话发送通知
         """
+        if not await self.claim_transfer(task_id, original_url, folder_path):
+            logger.info(f"夸克网盘资源已转存或正由其他任务转存，跳过: {original_url} -> {folder_path}")
+            if umo:
+                transfer = await self.wait_shared_transfer(original_url, folder_path)
+                self.notify_transfer_result(umo, folder_path, transfer)
+            return
+        
         try:
             # 标记任务为进行中
             self.pending_transfers[task_id] = {
@@ -753,7 +1144,14 @@ class MyPlugin(Star):
             self.pending_transfers[task_id]["status"] = "failed"
             self.pending_transfers[task_id]["error"] = str(e)
             logger.error(f"夸克网盘资源转存异常: {e}")
+        finally:
+            await self.finish_transfer(task_id, original_url, folder_path)
+            self.notify_transfer_result(umo, folder_path, self.pending_transfers.get(task_id, {}))
     
     async def terminate(self):
         """插件销毁"""
-        pass
\ No newline at end of file
+        for task in list(self.notify_tasks.values()) + list(self.liveness_tasks.values()):
+            task.cancel()
+        if self.session_store:
+            await self.session_store.close()
+        await self.cache.close()
\ No newline at end of file
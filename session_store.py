@@ -0,0 +1,114 @@
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from typing import Optional
+
+from astrbot.api import logger
+
+
+class SessionStore:
+    """
+    用户会话持久化存储
+
+    会话以 zlib 压缩后的紧凑 JSON 存入 SQLite，写入先在内存中累积，
+    由后台任务按批次在线程池中落盘；读取按用户在首次访问时进行，
+    因此启动耗时与已存储的会话数量无关
+    """
+
+    def __init__(self, db_path: str, ttl: float = 86400, flush_interval: float = 2.0):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        # 等待落盘的会话
+        self._dirty = {}
+        self._flush_task = None
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "user_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _load(self, user_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT data, updated_at FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def _write(self, sessions: dict):
+        # 序列化和压缩也在线程池中完成，避免占用事件循环
+        now = time.time()
+        rows = [
+            (user_id, zlib.compress(json.dumps(session, ensure_ascii=False, separators=(",", ":")).encode("utf-8")), now)
+            for user_id, session in sessions.items()
+        ]
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sessions (user_id, data, updated_at) VALUES (?, ?, ?)",
+                    rows
+                )
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+
+    async def load(self, user_id: str) -> Optional[dict]:
+        """读取用户会话，不存在或已过期时返回 None"""
+        if user_id in self._dirty:
+            # 返回副本，调用方的修改不会影响即将在线程池中序列化的会话
+            return copy.deepcopy(self._dirty[user_id])
+        try:
+            return await asyncio.to_thread(self._load, user_id)
+        except Exception as e:
+            logger.error(f"读取用户会话失败: {e}")
+            return None
+
+    def save(self, user_id: str, session: dict):
+        """
+        标记用户会话待写入，实际写入由后台任务批量完成
+
+        会话会在线程池中序列化，传入后调用方不应再修改它
+        """
+        self._dirty[user_id] = session
+
+    async def flush(self):
+        """将所有待写入的会话一次性落盘"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        try:
+            await asyncio.to_thread(self._write, dirty)
+        except Exception as e:
+            logger.error(f"写入用户会话失败: {e}")
+            # 写入失败时放回队列，等待下次重试，新的修改优先
+            dirty.update(self._dirty)
+            self._dirty = dirty
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """启动后台落盘任务"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """停止后台任务并写入剩余会话"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()